@@ -55,21 +55,33 @@ def analyze_psgc_sheet(psgc: pd.DataFrame) -> None:
     print()
 
 
+FOOTNOTE_MARKERS = frozenset({"a", "b", "c"})
+
+
 def clean_table(df: pd.DataFrame, label_column: str) -> pd.DataFrame:
-    df = df.dropna(how="all")
-    df = df.dropna(subset=[label_column])
-    df = df[~df[label_column].astype(str).str.contains("NOTE", case=False)]
-    df = df[~df[label_column].isin(list("abc"))]
-    return df
+    # One compound mask and one slice instead of four chained filters, each
+    # of which would copy the surviving rows again.
+    labels = df[label_column].astype(str)
+    mask = (
+        df.notna().any(axis=1)
+        & df[label_column].notna()
+        & ~labels.str.upper().str.contains("NOTE", regex=False, na=False)
+        & ~df[label_column].isin(FOOTNOTE_MARKERS)
+    )
+    return df.loc[mask]
 
 
-def analyze_summary_tables(path: Path) -> None:
-    national = pd.read_excel(path, sheet_name="National Summary", header=9)
+def analyze_summary_tables(xl: pd.ExcelFile) -> None:
+    national = xl.parse(
+        "National Summary",
+        header=9,
+        usecols=["REGION", "PROV.", "CITIES", "MUN.", "BGY.", "POPULATION\n(2024 POPCEN)"],
+    )
     national = clean_table(national, "REGION")
     for col in ["PROV.", "CITIES", "MUN.", "BGY.", "POPULATION\n(2024 POPCEN)"]:
         national[col] = pd.to_numeric(national[col], errors="coerce")
 
-    prov_sum = pd.read_excel(path, sheet_name="Prov Sum", header=9)
+    prov_sum = xl.parse("Prov Sum", header=9)
     prov_sum = clean_table(prov_sum, "NAME")
     for col in ["PROV.", "CITIES", "MUN.", "BGY."]:
         prov_sum[col] = pd.to_numeric(prov_sum[col], errors="coerce")
@@ -101,10 +113,10 @@ def analyze_summary_tables(path: Path) -> None:
 
 def main() -> None:
     path = Path("PSGC-3Q-2025-Publication-Datafile.xlsx")
-    xl = pd.ExcelFile(path)
+    xl = pd.ExcelFile(path, engine="calamine")
     summarize_sheet_shapes(xl)
     analyze_psgc_sheet(xl.parse("PSGC"))
-    analyze_summary_tables(path)
+    analyze_summary_tables(xl)
 
 
 if __name__ == "__main__":
@@ -1,33 +1,61 @@
 from __future__ import annotations
 
 import argparse
+import hashlib
 import os
 import sys
 from pathlib import Path
 from typing import Sequence
 
 import psycopg
+import pyarrow as pa
+
+try:
+    from pgpq import ArrowToPostgresBinaryEncoder
+except ImportError:  # fall back to psycopg's own binary row encoding
+    ArrowToPostgresBinaryEncoder = None
 
 import etl_psgc
 
 
-def run_etl(workbook: Path, reference_year: int, source_label: str) -> Path:
+def run_etl(
+    workbook: Path, reference_year: int, source_label: str
+) -> dict[str, pa.Table]:
     print("Running ETL...")
     df = etl_psgc.load_psgc(workbook)
-    etl_psgc.export_tables(df, reference_year, source_label)
-    return etl_psgc.OUTPUT_DIR
+    return etl_psgc.export_tables(df, reference_year, source_label)
 
 
 def apply_schema(conninfo: str, schema_file: Path) -> None:
+    """Apply schema.sql unless this exact version already ran.
+
+    The SHA-256 of the file is recorded in a tiny _schema_meta table; on a
+    match the (idempotent but not free) DDL round-trip is skipped entirely.
+    """
     print("Applying schema...")
     sql = schema_file.read_text()
+    digest = hashlib.sha256(sql.encode()).hexdigest()
     with psycopg.connect(conninfo, autocommit=True) as conn:
         with conn.cursor() as cur:
+            cur.execute(
+                "CREATE TABLE IF NOT EXISTS _schema_meta ("
+                "hash TEXT PRIMARY KEY, "
+                "applied_at TIMESTAMP WITH TIME ZONE DEFAULT NOW())"
+            )
+            cur.execute("SELECT 1 FROM _schema_meta WHERE hash = %s", (digest,))
+            if cur.fetchone():
+                print("Schema unchanged; skipping.")
+                return
             cur.execute(sql)
+            cur.execute(
+                "INSERT INTO _schema_meta (hash) VALUES (%s) "
+                "ON CONFLICT (hash) DO NOTHING",
+                (digest,),
+            )
     print("Schema applied.")
 
 
-CHUNK_SIZE = 1 << 20  # 1 MB
+CHUNK_SIZE = 16 << 20  # 16 MiB
 COPY_COLUMNS = {
     "locations": [
         "psgc_code",
@@ -55,25 +83,67 @@ COPY_COLUMNS = {
 }
 
 
-def copy_csv(conninfo: str, table: str, csv_path: Path) -> None:
+# psycopg type names for the Arrow types used in etl_psgc.TABLE_SCHEMAS,
+# needed so copy.write_row serializes to the exact column widths.
+ARROW_TO_PG_TYPES = {
+    pa.string(): "text",
+    pa.int16(): "int2",
+    pa.int64(): "int8",
+}
+WRITE_ROW_BATCH = 50_000
+
+
+def write_rows(copy: psycopg.Copy, data: pa.Table) -> None:
+    """Binary-COPY an Arrow table row by row with psycopg's own encoder."""
+    copy.set_types([ARROW_TO_PG_TYPES[field.type] for field in data.schema])
+    for batch in data.to_batches(max_chunksize=WRITE_ROW_BATCH):
+        for row in zip(*(column.to_pylist() for column in batch.columns)):
+            copy.write_row(row)
+
+
+def copy_table(cur: psycopg.Cursor, table: str, data: pa.Table) -> None:
+    """Stream an Arrow table into Postgres via binary COPY.
+
+    Encoding happens client-side (whole record batches through pgpq when it
+    is installed, otherwise psycopg's write_row), so neither pandas nor
+    Postgres ever round-trips the values through CSV text. The caller owns
+    the transaction (and the truncation that precedes the load).
+    """
+    print(f"Loading {table} ({data.num_rows:,} rows, binary COPY)...")
+    columns = COPY_COLUMNS[table]
+    with cur.copy(
+        f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT BINARY)"
+    ) as copy:
+        if ArrowToPostgresBinaryEncoder is not None:
+            encoder = ArrowToPostgresBinaryEncoder(data.schema)
+            copy.write(encoder.write_header())
+            for batch in data.to_batches():
+                copy.write(encoder.write_batch(batch))
+            copy.write(encoder.finish())
+        else:
+            write_rows(copy, data)
+    print(f"{table} loaded.")
+
+
+def copy_csv(cur: psycopg.Cursor, table: str, csv_path: Path) -> None:
     if not csv_path.exists():
         raise FileNotFoundError(f"CSV not found for {table}: {csv_path}")
     print(f"Loading {table} from {csv_path}...")
-    with psycopg.connect(conninfo, autocommit=True) as conn:
-        with conn.cursor() as cur, csv_path.open("r", encoding="utf-8") as fh:
-            cur.execute(f"TRUNCATE TABLE {table} CASCADE")
-            columns = COPY_COLUMNS.get(table)
-            column_sql = (
-                f"({', '.join(columns)})" if columns else ""
-            )
-            with cur.copy(
-                f"COPY {table} {column_sql} FROM STDIN WITH (FORMAT csv, HEADER true)"
-            ) as copy:
-                while True:
-                    chunk = fh.read(CHUNK_SIZE)
-                    if not chunk:
-                        break
-                    copy.write(chunk)
+    # Binary mode: COPY accepts raw bytes, so there is no reason to
+    # decode UTF-8 into Python strings just to re-encode them.
+    with csv_path.open("rb") as fh:
+        columns = COPY_COLUMNS.get(table)
+        column_sql = (
+            f"({', '.join(columns)})" if columns else ""
+        )
+        with cur.copy(
+            f"COPY {table} {column_sql} FROM STDIN WITH (FORMAT csv, HEADER true)"
+        ) as copy:
+            while True:
+                chunk = fh.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                copy.write(chunk)
     print(f"{table} loaded.")
 
 
@@ -105,6 +175,11 @@ def parse_args(argv: Sequence[str] | None = None) -> argparse.Namespace:
         default="2024 POPCEN (PSA)",
         help="Population source label.",
     )
+    parser.add_argument(
+        "--from-csv",
+        action="store_true",
+        help="Load from the CSVs in data_exports instead of in-memory tables.",
+    )
     parser.add_argument(
         "--database-url",
         type=str,
@@ -122,9 +197,11 @@ def main(argv: Sequence[str] | None = None) -> None:
         )
     conninfo = args.database_url.strip().strip('"').strip("'")
 
-    output_dir = run_etl(args.workbook, args.reference_year, args.source_label)
+    tables = run_etl(args.workbook, args.reference_year, args.source_label)
     apply_schema(conninfo, args.schema)
 
+    # Dependency order: locations first, since every other table has a
+    # foreign key to it.
     load_order = [
         "locations",
         "population_stats",
@@ -133,9 +210,21 @@ def main(argv: Sequence[str] | None = None) -> None:
         "settlement_tags",
     ]
 
-    for table in load_order:
-        csv_path = output_dir / f"{table}.csv"
-        copy_csv(conninfo, table, csv_path)
+    # One connection, one transaction: a single multi-table TRUNCATE followed
+    # by the five COPYs on the same session, so the whole load pays one
+    # TLS+auth handshake and is atomic — a failed COPY rolls everything back,
+    # leaving the old data in place.
+    with psycopg.connect(conninfo) as conn:
+        with conn.cursor() as cur:
+            cur.execute("SET LOCAL synchronous_commit = off")
+            cur.execute(
+                f"TRUNCATE TABLE {', '.join(load_order)} RESTART IDENTITY CASCADE"
+            )
+            for table in load_order:
+                if args.from_csv:
+                    copy_csv(cur, table, etl_psgc.OUTPUT_DIR / f"{table}.csv")
+                else:
+                    copy_table(cur, table, tables[table])
 
     print("Deployment complete.")
 
@@ -1,14 +1,74 @@
 from __future__ import annotations
 
 import argparse
+import functools
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Optional
 
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+from pyarrow import csv as pacsv
 
 PSGC_SHEET = "PSGC"
 OUTPUT_DIR = Path("data_exports")
 LEVEL_ORDER = {"Reg": 0, "Prov": 1, "City": 2, "Mun": 2, "SubMun": 3, "Bgy": 4, "Other": 5}
+CSV_WRITE_OPTIONS = pacsv.WriteOptions(include_header=True, quoting_style="needed")
+
+# Arrow schemas matching the Postgres column types, so the tables can be
+# streamed straight into COPY ... (FORMAT BINARY) without re-parsing text.
+# SMALLINT columns must be int16 and BIGINT columns int64 or the binary
+# protocol rejects the field.
+TABLE_SCHEMAS: dict[str, pa.Schema] = {
+    "locations": pa.schema(
+        [
+            ("psgc_code", pa.string()),
+            ("name", pa.string()),
+            ("level_code", pa.string()),
+            ("parent_psgc", pa.string()),
+            ("correspondence_code", pa.string()),
+            ("status", pa.string()),
+            ("old_names", pa.string()),
+        ]
+    ),
+    "population_stats": pa.schema(
+        [
+            ("psgc_code", pa.string()),
+            ("reference_year", pa.int16()),
+            ("population", pa.int64()),
+            ("source", pa.string()),
+        ]
+    ),
+    "city_classifications": pa.schema(
+        [
+            ("psgc_code", pa.string()),
+            ("class_code", pa.string()),
+            ("source", pa.string()),
+        ]
+    ),
+    "income_classifications": pa.schema(
+        [
+            ("psgc_code", pa.string()),
+            ("bracket_code", pa.string()),
+            ("source", pa.string()),
+            ("effective_year", pa.int16()),
+        ]
+    ),
+    "settlement_tags": pa.schema(
+        [
+            ("psgc_code", pa.string()),
+            ("tag_code", pa.string()),
+            ("source", pa.string()),
+            ("reference_year", pa.int16()),
+        ]
+    ),
+}
+
+
+def write_csv(table: pa.Table, path: Path) -> None:
+    """Write an Arrow table as CSV via PyArrow's multithreaded C++ writer."""
+    pacsv.write_csv(table, path, write_options=CSV_WRITE_OPTIONS)
 
 
 def normalize_code(value: object) -> Optional[str]:
@@ -23,23 +83,29 @@ def normalize_code(value: object) -> Optional[str]:
     return digits.zfill(10)
 
 
-def candidate_parents(code: str, level: str) -> list[str]:
+@functools.lru_cache(maxsize=65536)
+def candidate_parents(code: str, level: str) -> tuple[str, ...]:
+    """Scalar reference for the hierarchy rules used by ``infer_parents``.
+
+    Cached so repeated spot checks of the same (code, level) pair reuse the
+    candidate tuples instead of rebuilding the prefix strings.
+    """
     region = code[:2] + "00000000"
     province = code[:4] + "000000"
     city_or_mun = code[:6] + "0000"
     submun = code[:8] + "00"
 
     if level == "Reg":
-        return []
+        return ()
     if level == "Prov":
-        return [region]
+        return (region,)
     if level in {"City", "Mun"}:
-        return [province, region]
+        return (province, region)
     if level == "SubMun":
-        return [city_or_mun, province, region]
+        return (city_or_mun, province, region)
     if level == "Bgy":
-        return [submun, city_or_mun, province, region]
-    return [province, region]
+        return (submun, city_or_mun, province, region)
+    return (province, region)
 
 
 def infer_parent(code: str, level: str, valid_codes: set[str]) -> Optional[str]:
@@ -53,12 +119,28 @@ def load_psgc(path: Path) -> pd.DataFrame:
     df = pd.read_excel(
         path,
         sheet_name=PSGC_SHEET,
+        engine="calamine",
+        usecols=[
+            "10-digit PSGC",
+            "Name",
+            "Correspondence Code",
+            "Geographic Level",
+            "Old names",
+            "City Class",
+            "Income\nClassification (DOF DO No. 074.2024)",
+            "Urban / Rural\n(based on 2020 CPH)",
+            "2024 Population",
+            "Status",
+        ],
         dtype={
             "10-digit PSGC": str,
             "Correspondence Code": str,
             "2024 Population": "float64",
         },
     )
+    # calamine does not honour dtype= for every column; pin the code columns.
+    df["10-digit PSGC"] = df["10-digit PSGC"].astype("string")
+    df["Correspondence Code"] = df["Correspondence Code"].astype("string")
     df = df.rename(
         columns={
             "10-digit PSGC": "psgc_code",
@@ -75,18 +157,82 @@ def load_psgc(path: Path) -> pd.DataFrame:
     )
     df = df[df["psgc_code"].notna()]
     df["level_code"] = df["level_code"].fillna("Other")
-    df["psgc_code"] = df["psgc_code"].apply(normalize_code)
+    # Tiny fixed vocabularies (7 levels, a handful of class/tag codes):
+    # categorical storage keeps them as int8 codes instead of Python strings.
+    for column in ["level_code", "city_class", "income_class", "urban_rural", "status"]:
+        df[column] = df[column].astype("category")
+    # Vectorized equivalent of normalize_code: strip non-digits, blank -> NA,
+    # zero-pad to the canonical 10 digits.
+    codes = df["psgc_code"].str.replace(r"\D", "", regex=True)
+    df["psgc_code"] = codes.where(codes.str.len() > 0).str.zfill(10)
+    # Integer twin of psgc_code (0 = missing): 8 bytes per code instead of a
+    # Python string, so parent derivation and sorting stay in integer lanes.
+    df["psgc_int"] = (
+        df["psgc_code"].to_numpy(dtype="U10", na_value="0").astype(np.uint64)
+    )
     return df
 
 
-def export_tables(df: pd.DataFrame, reference_year: int, source: str) -> None:
-    OUTPUT_DIR.mkdir(exist_ok=True)
-    valid_codes = {code for code in df["psgc_code"] if code}
+def infer_parents(df: pd.DataFrame) -> pd.Series:
+    """Vectorized parent inference over the whole frame.
 
-    df["parent_psgc"] = df.apply(
-        lambda row: infer_parent(row["psgc_code"], row["level_code"], valid_codes),
-        axis=1,
+    Mirrors the per-row rules in ``candidate_parents``: each level tries its
+    most specific parent first (barangays look for a sub-municipality before
+    a city, and so on), falling back level by level until a candidate exists
+    in the dataset. Runs as a handful of column-wise pandas/NumPy passes
+    instead of one Python call per row.
+    """
+    # Works on the uint64 twin of psgc_code: masking trailing digit pairs is
+    # integer division instead of string slicing, and np.isin against the
+    # sorted valid-code array is a C-level search per candidate column
+    # rather than N x 4 Python hash probes. 0 is the missing-code sentinel.
+    code = df["psgc_int"].to_numpy()
+    level = df["level_code"]
+    valid_codes = np.sort(code[code != 0])
+
+    region = code // 10**8 * 10**8
+    province = code // 10**6 * 10**6
+    city_or_mun = code // 10**4 * 10**4
+    submun = code // 10**2 * 10**2
+
+    is_reg = level.eq("Reg").to_numpy()
+    is_prov = level.eq("Prov").to_numpy()
+    is_submun = level.eq("SubMun").to_numpy()
+    is_bgy = level.eq("Bgy").to_numpy()
+
+    def usable(candidate: np.ndarray, allowed: np.ndarray) -> np.ndarray:
+        return allowed & (candidate != code) & np.isin(candidate, valid_codes)
+
+    parent = np.where(
+        usable(submun, is_bgy),
+        submun,
+        np.where(
+            usable(city_or_mun, is_bgy | is_submun),
+            city_or_mun,
+            np.where(
+                usable(province, ~is_reg & ~is_prov),
+                province,
+                np.where(usable(region, ~is_reg), region, 0),
+            ),
+        ),
     )
+    # Back to zero-padded text only at the boundary (one np.char pass).
+    parent_str = np.char.zfill(parent.astype("U10"), 10)
+    return pd.Series(np.where(parent != 0, parent_str, None), index=df.index)
+
+
+def export_tables(
+    df: pd.DataFrame, reference_year: int, source: str
+) -> dict[str, pa.Table]:
+    """Split the PSGC frame into the five normalized tables.
+
+    Returns the tables as Arrow tables (typed per ``TABLE_SCHEMAS``) so the
+    loader can stream them to Postgres directly; the CSVs written to
+    ``OUTPUT_DIR`` remain as debug artifacts and for manual ``\\copy`` loads.
+    """
+    OUTPUT_DIR.mkdir(exist_ok=True)
+
+    df["parent_psgc"] = infer_parents(df)
 
     locations = df[
         [
@@ -97,52 +243,109 @@ def export_tables(df: pd.DataFrame, reference_year: int, source: str) -> None:
             "correspondence_code",
             "status",
             "old_names",
+            "psgc_int",
         ]
     ].copy()
-    locations["old_names"] = locations["old_names"].fillna("").str.strip()
+    # Empty strings become NA so the CSV keeps an empty (NULL-loading) field.
+    old_names = locations["old_names"].fillna("").str.strip()
+    locations["old_names"] = old_names.where(old_names != "")
     locations = locations.drop_duplicates(subset=["psgc_code"])
-    locations["level_rank"] = locations["level_code"].map(
-        LEVEL_ORDER
-    ).fillna(LEVEL_ORDER["Prov"])
-    locations = locations.sort_values(["level_rank", "psgc_code"]).drop(
-        columns=["level_rank"]
+    # Sort by (level rank, code) on dense integer lanes: a small LUT indexed
+    # by the level_code category codes yields the rank without a .map pass,
+    # and np.lexsort orders int8/uint64 arrays directly.
+    ranks_lut = np.array(
+        [
+            LEVEL_ORDER.get(category, LEVEL_ORDER["Prov"])
+            for category in locations["level_code"].cat.categories
+        ],
+        dtype=np.int8,
     )
-    locations.to_csv(OUTPUT_DIR / "locations.csv", index=False)
-
-    population = df[
-        ["psgc_code", "population_2024"]
-    ].dropna(subset=["population_2024"])
-    population = population.rename(columns={"population_2024": "population"})
-    population["population"] = population["population"].round().astype(int)
-    population["reference_year"] = reference_year
-    population["source"] = source
-    population = population[
-        ["psgc_code", "reference_year", "population", "source"]
-    ]
-    population.to_csv(OUTPUT_DIR / "population_stats.csv", index=False)
-
-    city_classes = df.dropna(subset=["city_class"])[
-        ["psgc_code", "city_class"]
-    ].drop_duplicates()
-    city_classes = city_classes.rename(columns={"city_class": "class_code"})
-    city_classes["source"] = source
-    city_classes.to_csv(OUTPUT_DIR / "city_classifications.csv", index=False)
-
-    income = df.dropna(subset=["income_class"])[
-        ["psgc_code", "income_class"]
-    ].drop_duplicates()
-    income = income.rename(columns={"income_class": "bracket_code"})
-    income["source"] = "DOF DO 074-2024"
-    income["effective_year"] = reference_year
-    income.to_csv(OUTPUT_DIR / "income_classifications.csv", index=False)
-
-    settlement = df.dropna(subset=["urban_rural"])[
-        ["psgc_code", "urban_rural"]
-    ].drop_duplicates()
-    settlement = settlement.rename(columns={"urban_rural": "tag_code"})
-    settlement["source"] = "2020 CPH"
-    settlement["reference_year"] = 2020
-    settlement.to_csv(OUTPUT_DIR / "settlement_tags.csv", index=False)
+    level_rank = ranks_lut[locations["level_code"].cat.codes.to_numpy()]
+    order = np.lexsort((locations["psgc_int"].to_numpy(), level_rank))
+    locations = locations.iloc[order].drop(columns=["psgc_int"])
+
+    # One pass over the underlying arrays instead of a fresh
+    # dropna/drop_duplicates walk per attribute table: pull the shared
+    # columns out once, then build each table from boolean-masked slices.
+    psgc_str = df["psgc_code"].to_numpy(dtype="U10", na_value="")
+    psgc_int = df["psgc_int"].to_numpy()
+
+    population_arr = df["population_2024"].to_numpy()
+    mask_pop = ~np.isnan(population_arr)
+    population = pd.DataFrame(
+        {
+            "psgc_code": psgc_str[mask_pop],
+            "reference_year": reference_year,
+            "population": population_arr[mask_pop].round().astype(np.int64),
+            "source": source,
+        }
+    )
+
+    def classified(column: str) -> tuple[np.ndarray, np.ndarray]:
+        """Rows tagged in ``column`` as (psgc_code, label) arrays.
+
+        Works on the category codes: -1 marks untagged rows, and duplicate
+        (code, label) pairs collapse via np.unique while keeping
+        first-occurrence order. The pair packs into a single uint64 lane
+        (psgc_int needs 34 bits, the category code sits above bit 48), so
+        uniqueness is one sort over 8-byte keys instead of a 2-D scan.
+        """
+        codes = df[column].cat.codes.to_numpy()
+        mask = codes >= 0
+        packed = psgc_int[mask] | (codes[mask].astype(np.uint64) << np.uint64(48))
+        _, first = np.unique(packed, return_index=True)
+        first.sort()
+        labels = df[column].cat.categories.to_numpy()
+        return psgc_str[mask][first], labels[codes[mask][first]]
+
+    city_psgc, city_labels = classified("city_class")
+    city_classes = pd.DataFrame(
+        {"psgc_code": city_psgc, "class_code": city_labels, "source": source}
+    )
+
+    income_psgc, income_labels = classified("income_class")
+    income = pd.DataFrame(
+        {
+            "psgc_code": income_psgc,
+            "bracket_code": income_labels,
+            "source": "DOF DO 074-2024",
+            "effective_year": reference_year,
+        }
+    )
+
+    settlement_psgc, settlement_labels = classified("urban_rural")
+    settlement = pd.DataFrame(
+        {
+            "psgc_code": settlement_psgc,
+            "tag_code": settlement_labels,
+            "source": "2020 CPH",
+            "reference_year": 2020,
+        }
+    )
+
+    frames = {
+        "locations": locations,
+        "population_stats": population,
+        "city_classifications": city_classes,
+        "income_classifications": income,
+        "settlement_tags": settlement,
+    }
+    tables = {
+        name: pa.Table.from_pandas(frame, preserve_index=False).cast(
+            TABLE_SCHEMAS[name]
+        )
+        for name, frame in frames.items()
+    }
+    # Arrow's CSV writer releases the GIL, so the five writes overlap both
+    # formatting and disk I/O when dispatched on a thread pool.
+    with ThreadPoolExecutor(max_workers=len(tables)) as executor:
+        futures = [
+            executor.submit(write_csv, table, OUTPUT_DIR / f"{name}.csv")
+            for name, table in tables.items()
+        ]
+        for future in futures:
+            future.result()
+    return tables
 
 
 def parse_args() -> argparse.Namespace: